@@ -0,0 +1,184 @@
+import argparse, json, os, platform, random as rand, subprocess, sys, timeit
+import numpy as np
+import ringmodule as ring
+
+
+####
+####
+#
+# Benchmarks for the ringmodule hot paths
+#
+#   python ringbench.py                      time every case, compare with ringbench_baseline.json
+#   python ringbench.py --save-baseline      ...and make these timings the new baseline
+#   python ringbench.py -k import            only the cases named like 'import' (e.g. import ringmodule)
+#   python ringbench.py --raw                compare raw seconds (default: scaled by the python startup case)
+#   python ringbench.py --policies           wall time and flip counts of the RQPolicy flip orders
+#
+####
+####
+
+
+Here = os.path.dirname(os.path.abspath(__file__))
+BaselineFile = os.path.join(Here, 'ringbench_baseline.json')
+
+RingGrid = [(5, 10), (10, 10), (20, 5), (40, 3)]             # (n, x) of the random rings
+EnumGrid = [(4, 4), (3, 6), (2, 8)]                          # (m, n) of the ring enumerations
+Policies = [('Uniform', ring.NegSites), ('Leftmost', ring.LeftmostPolicy),
+            ('MostNegative', ring.MostNegativePolicy), ('RoundRobin', ring.RoundRobinPolicy)]
+
+
+def Rings(n, x, count=1, S=1):
+    '''return count random (n, x, S) rings, the same ones on every run'''
+    rand.seed(n*1000 + x)
+    return [ring.R_n_S(n, x, S) for i in range(count)]
+
+
+def Resolver(f, R):
+    '''return a callable that resolves a fresh copy of R with f (RQ and friends mutate their argument)'''
+    return lambda: f(R.copy())
+
+
+def Cases():
+    '''yield (name, callable) for every benchmark case'''
+    yield 'python startup', lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    yield 'import ringmodule', lambda: subprocess.run([sys.executable, '-c', 'import ringmodule'], cwd=Here, check=True)
+    for n, x in RingGrid:
+        R = Rings(n, x)[0]
+        tag = ' n=' + str(n) + ' x=' + str(x)
+        yield 'RQ' + tag, Resolver(ring.RQ, R)
+        yield 'RQFast' + tag, Resolver(ring.RQFast, R)
+        yield 'FastForwardRQ' + tag, Resolver(ring.FastForwardRQ, R)
+        yield 'RoundRQ' + tag, Resolver(ring.RoundRQ, R)
+        for name, policy in Policies:
+            yield 'RQPolicy[' + name + ']' + tag, Resolver(lambda R, policy=policy: ring.RQPolicy(R, policy), R)
+        yield 'BatchRQ[100]' + tag, lambda Rs=np.array(Rings(n, x, 100)): ring.BatchRQ(Rs, seed=0)
+        yield 'Entropy' + tag, lambda R=R: ring.Entropy(R)
+        yield 'Entropy2' + tag, lambda R=R: ring.Entropy2(R)
+        yield 'FastEntropy' + tag, lambda R=R: ring.FastEntropy(R)
+        yield 'CCost' + tag, lambda R=R: ring.CCost(R, 2)
+        yield 'AbsCost' + tag, lambda R=R: ring.AbsCost(R, 2)
+        yield 'AllHorseCollarsCost' + tag, lambda R=R: ring.AllHorseCollarsCost(R)
+        yield 'FastAllHorseCollarsCost' + tag, lambda R=R: ring.FastAllHorseCollarsCost(R)
+        yield 'OneHorseCollarCost' + tag, lambda R=R: ring.OneHorseCollarCost(R, 0)
+        yield 'ScholesCost' + tag, lambda R=R: ring.ScholesCost(R)
+        yield 'FastScholesCost' + tag, lambda R=R: ring.FastScholesCost(R)
+        yield 'Congruent' + tag, lambda R=R, R2=R[::-1]: ring.Congruent(R, R2)
+        yield 'CanonicalRing' + tag, lambda R=R: ring.CanonicalRing(R)
+    R = ring.SparseRing(10**6, [(0, 5), (3, -4), (500000, -3), (700000, 3)])
+    yield 'SparseFastForwardRQ n=10^6 k=4', lambda R=R: ring.SparseFastForwardRQ(R.copy())
+    for m, n in EnumGrid:
+        tag = ' m=' + str(m) + ' n=' + str(n)
+        yield 'GenerateAllPossibleRings' + tag, lambda m=m, n=n: ring.GenerateAllPossibleRings(m, n)
+        yield 'CountPossibleRings' + tag, lambda m=m, n=n: ring.CountPossibleRings(m, n)
+
+
+Reference = 'python startup'                                 # timed on every run; Compare scales by it
+Environment = ('python', 'numpy', 'machine')
+MicroCase = 1e-4                                             # cases faster than this (s per call) get more rounds
+
+
+def TimeCase(f, repeat=5, min_time=0.2):
+    '''return the best time (seconds per call) over repeat rounds, each of enough calls to last min_time;
+    microsecond cases, whose best time is the noisiest, get four times the rounds'''
+    timer = timeit.Timer(f)
+    number = 1
+    while timer.timeit(number) < min_time/repeat and number < 10**6: number *= 10
+    best = min(timer.repeat(repeat, number))/number
+    if best < MicroCase: best = min(best, min(timer.repeat(3*repeat, number))/number)
+    return best
+
+
+def RunBenchmarks(pattern='', repeat=5, min_time=0.2, verbose=True):
+    '''time every case whose name contains pattern, and the Reference case; return a results dict ready for json'''
+    results = {}
+    for name, f in Cases():
+        if pattern not in name and name != Reference: continue
+        results[name] = TimeCase(f, repeat, min_time)
+        if verbose: print('  ' + name.ljust(42) + ('%.3e' % results[name]).rjust(12) + ' s')
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def Scale(current, baseline):
+    '''return how much slower this machine runs right now than when baseline was taken, by the Reference case
+    (1 if either run lacks it)'''
+    t, t0 = current['results'].get(Reference), baseline['results'].get(Reference)
+    return t/t0 if t and t0 else 1.0
+
+
+def EnvironmentChanges(current, baseline):
+    '''return ['python 3.11.7 -> 3.12.1', ...] for each Environment entry that differs from the baseline's'''
+    return [k + ' ' + str(baseline.get(k)) + ' -> ' + str(current.get(k)) for k in Environment if current.get(k) != baseline.get(k)]
+
+
+def Compare(current, baseline, threshold=0.25, normalise=True):
+    '''return [(name, baseline, current, ratio)] for each case more than threshold slower than baseline; with
+    normalise, baseline times are first scaled by Scale, so a uniformly slower machine is not a regression'''
+    scale = Scale(current, baseline) if normalise else 1.0
+    slow = []
+    for name, t in current['results'].items():
+        t0 = baseline['results'].get(name)
+        if name == Reference or not t0: continue
+        if t > t0*scale*(1 + threshold): slow.append((name, t0*scale, t, t/(t0*scale)))
+    return slow
+
+
+def ComparePolicies(n, x, count=100):
+    '''print wall time and mean flip count of each flip-selection policy over the same count (n, x) rings'''
+    Rs = Rings(n, x, count)
+    print('  ' + str(count) + ' rings, n = ' + str(n) + ', x = ' + str(x))
+    for name, policy in Policies:
+        timer = timeit.default_timer()
+        fc = [ring.RQPolicy(R.copy(), policy)[0] for R in Rs]
+        elapsed = timeit.default_timer() - timer
+        print('    ' + name.ljust(14) + ('%.4f' % elapsed).rjust(10) + ' s   mean flips ' + ('%.1f' % (sum(fc)/count)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the ringmodule hot paths and compare them with a stored baseline.')
+    parser.add_argument('-k', '--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('-o', '--out', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', default=BaselineFile, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='flag cases this fraction slower than baseline')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to spend per case')
+    parser.add_argument('--raw', action='store_true', help='compare raw times, not scaled by the ' + Reference + ' case')
+    parser.add_argument('--policies', action='store_true', help='only compare the flip-selection policies, then exit')
+    args = parser.parse_args(argv)
+
+    if args.policies:
+        for n, x in RingGrid: ComparePolicies(n, x)
+        return 0
+
+    current = RunBenchmarks(args.filter, args.repeat, args.min_time)
+    if args.out:
+        with open(args.out, 'w') as f: json.dump(current, f, indent=1, sort_keys=True)
+    if args.save_baseline:                                   # cases left out by --filter keep their old timings
+        if os.path.exists(args.baseline) and args.filter:    #   and the new ones are scaled to the old Reference
+            with open(args.baseline) as f: old = json.load(f)
+            scale = Scale(current, old)
+            current['results'] = {**old['results'], **{name: t/scale for name, t in current['results'].items() if name != Reference}}
+        with open(args.baseline, 'w') as f: json.dump(current, f, indent=1, sort_keys=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        print('no baseline at ' + args.baseline)
+        return 0
+    with open(args.baseline) as f: baseline = json.load(f)
+    print()
+    changes = EnvironmentChanges(current, baseline)
+    if changes: print('  WARNING: the baseline was taken with ' + ', '.join(changes) + '; timings may not be comparable')
+    if not args.raw: print('  baseline times scaled by x' + ('%.2f' % Scale(current, baseline)) + ' (' + Reference + ')')
+    slow = Compare(current, baseline, args.threshold, normalise=not args.raw)
+    for name, t0, t, ratio in slow:
+        print('  REGRESSION ' + name + ': ' + ('%.3e' % t0) + ' -> ' + ('%.3e' % t) + ' s (x' + ('%.2f' % ratio) + ')')
+    if not slow: print('  no case is more than ' + str(int(100*args.threshold)) + '% slower than the baseline')
+    return 1 if slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+import ringmodule as ring
+
+
+####
+####
+#
+# The random flip process as an absorbing Markov chain
+#
+#   RQ flips a uniformly chosen negative site, so from a ring with k negative sites it moves to each of k
+#   successor rings with probability 1/k; quiescent rings are absorbing. For small rings the states reachable
+#   from a start ring are few enough to list (each ring is a tuple in a dict index), and the transitions form
+#   a sparse matrix from which absorption probabilities and the flip-count distribution follow exactly.
+#
+#   By the partial-sum argument of FastForwardRQ, every path has the same length and ends in the same ring,
+#   so both answers come out as point masses; the solver confirms that rather than assuming it.
+#
+####
+####
+
+
+class FlipChain:
+    '''
+    The reachable state graph of the random flip process from ring R. states[0] is R; index maps each
+    state (a tuple) to its number; P is the sparse transition matrix (row = from, column = to); absorbing
+    lists the quiescent states and transient the rest. Raises ValueError past max_states states.
+    '''
+
+    def __init__(self, R, max_states=10**6):
+        if sum(R) < 1 and not ring.Q(R): raise ValueError('a ring with sum ' + str(sum(R)) + ' never reaches Q')
+        self.states, self.index = [tuple(R)], {tuple(R): 0}
+        rows, cols, probs = [], [], []
+        k = 0
+        while k < len(self.states):                          # breadth first; states are appended as found
+            R = self.states[k]
+            nn, neg = ring.NegList(R)
+            for a in neg:
+                R2, v = ring.Flip(list(R), a)
+                R2 = tuple(R2)
+                if R2 not in self.index:
+                    if len(self.states) == max_states: raise ValueError('more than ' + str(max_states) + ' reachable states')
+                    self.index[R2] = len(self.states)
+                    self.states.append(R2)
+                rows.append(k)
+                cols.append(self.index[R2])
+                probs.append(1/nn)
+            k += 1
+        N = len(self.states)
+        self.P = sp.csr_matrix((probs, (rows, cols)), shape=(N, N))  # duplicate (row, col) pairs are summed
+        out = np.diff(self.P.indptr)
+        self.absorbing, self.transient = np.flatnonzero(out == 0), np.flatnonzero(out > 0)
+
+    def __len__(self):
+        return len(self.states)
+
+    def absorption(self):
+        '''return {quiescent ring: probability that RQ from states[0] ends there}'''
+        if not len(self.transient): return {self.states[0]: 1.0}
+        Q = self.P[self.transient][:, self.transient]
+        B = self.P[self.transient][:, self.absorbing]
+        I = sp.identity(len(self.transient), format='csc')
+        X = spsolve((I - Q).tocsc(), B.toarray())            # X[i, j] = P(end in absorbing j | start in transient i)
+        X = np.atleast_2d(X.reshape(len(self.transient), len(self.absorbing)))
+        start = int(np.flatnonzero(self.transient == 0)[0])
+        return {self.states[j]: float(p) for j, p in zip(self.absorbing, X[start]) if p > 0}
+
+    def expected_flips(self):
+        '''return the mean flip count from states[0], via the fundamental matrix: (I - Q) t = 1'''
+        if not len(self.transient): return 0.0
+        Q = self.P[self.transient][:, self.transient]
+        I = sp.identity(len(self.transient), format='csc')
+        t = np.atleast_1d(spsolve((I - Q).tocsc(), np.ones(len(self.transient))))
+        return float(t[int(np.flatnonzero(self.transient == 0)[0])])
+
+    def flip_counts(self):
+        '''return p with p[k] = probability that RQ from states[0] takes exactly k flips'''
+        PT = self.P.T.tocsr()
+        quiet = np.zeros(len(self), dtype=bool)
+        quiet[self.absorbing] = True
+        x, p = np.zeros(len(self)), []
+        x[0] = 1.0
+        while x.sum() > 1e-12:                               # with S > 0 no state recurs, so paths end
+            if len(p) == len(self): raise ValueError('the flip process from ' + str(list(self.states[0])) + ' never ends')
+            p.append(float(x[quiet].sum()))
+            x[quiet] = 0.0
+            x = PT @ x
+        return np.array(p)
+
+
+def CheckFlipChain(R):
+    '''solve the chain from R and compare it with FastForwardRQ: one final ring and one flip count; return bool'''
+    chain = FlipChain(R)
+    Rq = list(R)
+    fc, fs = ring.FastForwardRQ(Rq) if not ring.Q(Rq) else (0, 0)
+    ends, p = chain.absorption(), chain.flip_counts()
+    agree = len(ends) == 1 and np.isclose(ends.get(tuple(Rq), 0), 1) and np.isclose(p[fc], 1) \
+        and np.isclose(chain.expected_flips(), fc)
+    if not agree: print('    mismatch: ' + str(list(R)) + ': ' + str(ends) + ', flip counts ' + str(p))
+    return agree
@@ -1,7 +1,13 @@
 import random as rand
 from random import randint, choice
-from math import fabs, sqrt
-import numpy as np, matplotlib.pyplot as plt, sys
+from math import fabs, sqrt, gcd
+from functools import lru_cache
+from time import perf_counter
+from collections import OrderedDict
+from heapq import heapify, heappop, heappush
+from array import array
+from itertools import product
+import numpy as np, sys
 
 
 ####
@@ -36,23 +42,131 @@ def R_n_rough(n, x):
 
 def R_n(n, x):
     '''builds and returns a random n-vertex ring: all values on [-x, x], sum = 1'''
-    tries = 0
-    while True:
-        p = [randint(-x, x) for i in range(n)]
-        if sum(p) == 1: return p
-        tries += 1
-        if tries > 1000000: break
-    return []
+    return RandomBoundedRing(n, x, 1)
 
 def R_n_S(n, x, S):
     '''builds, returns a random n-vertex ring: all values on [-x, x], sum = S'''
-    tries = 0
-    while True:
-        p = [randint(-x, x) for i in range(n)]
-        if sum(p) == S: return p
-        tries += 1
-        if tries > 1000000: return 0
-    return []
+    return RandomBoundedRing(n, x, S)
+
+MaxCountTable = 2**20                                        # largest n*n*x for which RandomBoundedRing uses the DP table
+MaxSplitSum = 2**24                                          # largest n*x it samples at all (SplitBoundedRing: ~60*n*x bytes)
+
+@lru_cache(maxsize=8)
+def BoundedCompositionCounts(n, x):
+    '''return C where C[k][s + k*x] counts the k-site vectors with all values on [-x, x] and sum s (k = 0..n)'''
+    C = [[1]]
+    for k in range(1, n + 1):
+        prev, w = C[-1], 2*x + 1
+        run, row = 0, []                                     # sliding window sum of w entries of the previous row
+        for i in range(2*k*x + 1):
+            if i < len(prev): run += prev[i]
+            if i >= w: run -= prev[i - w]
+            row.append(run)
+        C.append(row)
+    return tuple(C)
+
+def CountBoundedRings(n, x, S):
+    '''return the number of n-site vectors with all values on [-x, x] and sum S (rotations counted separately)'''
+    if abs(S) > n*x: return 0
+    return BoundedCompositionCounts(n, x)[n][S + n*x]
+
+def RandomBoundedRing(n, x, S, rng=rand):
+    '''return a uniformly random n-site ring with all values on [-x, x] and sum S (rng: random module or random.Random)
+
+    Exact: site values are drawn one at a time weighted by the BoundedCompositionCounts of the remaining
+    sites. That table holds ~n*n*x integers, so past MaxCountTable entries the ring is split in halves
+    instead (see SplitBoundedRing), which needs no table larger than that and is exact to float rounding.
+    Its FFTs take memory ~n*x, so an n*x beyond MaxSplitSum (about 1 GB) raises ValueError up front; the one
+    ring with S = +-n*x is always returned.'''
+    if abs(S) > n*x: raise ValueError('no ring of ' + str(n) + ' sites on [-' + str(x) + ', ' + str(x) + '] has sum ' + str(S))
+    if abs(S) == n*x: return [S//n]*n if n else []
+    if n*n*x > MaxCountTable:
+        if n*x > MaxSplitSum: raise ValueError('n*x = ' + str(n*x) + ' is past MaxSplitSum = ' + str(MaxSplitSum) + ': too large to sample')
+        return SplitBoundedRing(n, x, S, rng)
+    C = BoundedCompositionCounts(n, x)
+    R, t = [], S                                             # t is the sum still owed by the remaining sites
+    for k in range(n, 0, -1):                                # k sites remain, including this one
+        r = rng.randrange(C[k][t + k*x])
+        for v in range(max(-x, t - (k-1)*x), min(x, t + (k-1)*x) + 1):
+            r -= C[k-1][t - v + (k-1)*x]                     # number of completions once this site is v
+            if r < 0: break
+        R.append(v)
+        t -= v
+    return R
+
+def Tilt(w, mean):
+    '''return lam such that a site on [0, w-1] drawn with weight exp(lam*value) has the given mean'''
+    u, lo, hi = np.arange(w), -60.0, 60.0
+    for i in range(100):                                     # bisect: the tilted mean rises with lam
+        lam = (lo + hi)/2
+        q = np.exp(lam*u - max(lam*(w - 1), 0.0))
+        if (u*q).sum()/q.sum() < mean: lo = lam
+        else: hi = lam
+    return lam
+
+def TiltedSumDistribution(m, w, lam):
+    '''return p, p[s] = probability that m independent sites on [0, w-1], each drawn with weight exp(lam*value),
+    sum to s (s = 0..m*(w-1)); the m-fold convolution is one FFT power'''
+    q = np.exp(lam*np.arange(w) - max(lam*(w - 1), 0.0))
+    L = m*(w - 1) + 1                                        # the support; an FFT at least this long does not wrap
+    N = 1 << (L - 1).bit_length()                            # (a power of two: other lengths can be far slower)
+    return np.maximum(np.fft.irfft(np.fft.rfft(q/q.sum(), N)**m, N)[:L], 0.0)
+
+def SplitBoundedRing(n, x, S, rng=rand):
+    '''
+    RandomBoundedRing for large n. Each piece of the ring (m sites owing sum T) picks the sum of its first m//2
+    sites with probability proportional to the number of ways to complete both halves, and the halves are split
+    in turn, level by level, down to pieces small enough for the exact table. The completion counts come from
+    TiltedSumDistribution: the tilt multiplies every completion of a piece by the same factor, so the split
+    probabilities are exact but for float rounding. One tilt, centred on the ring's mean site, serves every
+    piece (a piece's sum is rarely many deviations off it; those few get their own), so each level needs one
+    FFT per piece size. Time ~n*x*log(n*x)*log(n); memory ~n*x floats.
+    '''
+    w = 2*x + 1
+    lam = Tilt(w, (S + n*x)/n)
+    pieces = [(n, S + n*x)]                                  # in ring order: (sites, sum shifted to [0, 2x]) or a filled list
+    while any(isinstance(p, tuple) for p in pieces):
+        rows, split = {}, []                                 # rows: TiltedSumDistribution by size, for this level only
+        for p in pieces:
+            if isinstance(p, list):
+                split.append(p)
+                continue
+            m, T = p
+            if T in (0, m*(w - 1)): split.append([T//m - x]*m)  # every site at its bound: the only way
+            elif m*m*x <= MaxCountTable: split.append(RandomBoundedRing(m, x, T - m*x, rng))
+            else:
+                m1, m2 = m//2, m - m//2
+                lo, hi = max(0, T - m2*(w - 1)), min(m1*(w - 1), T)
+                for k in (m1, m2):
+                    if k not in rows: rows[k] = TiltedSumDistribution(k, w, lam)
+                P1, P2 = rows[m1], rows[m2]
+                weights = P1[lo:hi + 1]*P2[T - hi:T - lo + 1][::-1]  # weights[k] for a first half summing to lo + k
+                if not weights.max() > 1e-12*P1.max()*P2.max():  # too far in the tails for this tilt: re-tilt
+                    own = Tilt(w, T/m)
+                    P1, P2 = TiltedSumDistribution(m1, w, own), TiltedSumDistribution(m2, w, own)
+                    weights = P1[lo:hi + 1]*P2[T - hi:T - lo + 1][::-1]
+                cum = np.cumsum(weights)
+                T1 = lo + min(int(np.searchsorted(cum, rng.random()*cum[-1], side='right')), hi - lo)
+                split += [(m1, T1), (m2, T - T1)]
+        pieces = split
+    return [v for p in pieces for v in p]
+
+def BoundedRings(n, x, S):
+    '''yield (as new lists) all n-site vectors with values on [-x, x] and sum S, in IncrementR (odometer) order'''
+    if abs(S) > n*x: return
+    if n == 0:
+        yield []
+        return
+    R = [0]*n
+    def fill(k, t):                                          # sites 0..k-1 are still open and must sum to t
+        if k == 1:
+            R[0] = t
+            yield R[:]
+            return
+        for v in range(max(-x, t - (k-1)*x), min(x, t + (k-1)*x) + 1):
+            R[k-1] = v
+            yield from fill(k-1, t - v)
+    yield from fill(n, S)
 
 def kJustify(k, n):
     '''ensure site index k is on [0, n-1]'''
@@ -147,20 +261,258 @@ def Entropy2(R):
     return s1, s2, s1 + s2
 
 
-def RQ(R, verbose=False):
-    '''for R, verbose False: resolve to Q via random choices and return fc, fs'''
+def FastEntropy(R):
+    '''return Entropy(R) in O(n) via prefix sums; R may also be a 2D array of rings (one entropy per row)
+
+    With d = j - i the pair term R[i]*R[j]*(d*d - n*d) expands into powers of i and j, so each site j only
+    needs the running sums of R[i], i*R[i] and i*i*R[i] over i < j. Arithmetic is int64 when that provably
+    cannot overflow and exact Python integers otherwise.'''
+    A = np.asarray(R)
+    batch = A.ndim == 2
+    if not batch: A = A.reshape(1, -1)
+    n = A.shape[1]
+    S1 = int(np.abs(A.astype(object)).sum(axis=1).max()) if A.size else 0  # in Python ints: the bound must not wrap
+    dtype = np.int64 if 3*n*n*S1*S1 < 2**62 else object
+    A = A.astype(dtype)
+    j = np.arange(n, dtype=np.int64).astype(dtype)
+    P0 = np.cumsum(A, axis=1) - A                            # sum of R[i] over i < j
+    P1 = np.cumsum(A*j, axis=1) - A*j                        # sum of i*R[i] over i < j
+    P2 = np.cumsum(A*j*j, axis=1) - A*j*j                    # sum of i*i*R[i] over i < j
+    E = (A*((j*j - n*j)*P0 + (n - 2*j)*P1 + P2)).sum(axis=1)
+    if batch: return E
+    return int(E[0])
+
+
+def RQ(R, verbose=False, observer=None):
+    '''for R, verbose False: resolve to Q via random choices and return fc, fs (observer: see RingProfile)'''
     fc, fs = 0, 0                                            # reset flip count and sum
     while not Q(R):                                          # R -> Q flip iteration
         if verbose: print(Entropy(R), R)       
         nn, nl  = NegList(R)                                 # number and list of negative sites
+        if observer is not None: observer(fc, -1, nn)        #   (report the scan)
         if nn < 1: return 0, 0                               # check error condition 
-        R, v    = Flip(R, nl[rand.randint(0, nn-1)])         # flip a randomly chosen negative-valued site 
-                                                             #   returns the resulting R and -2a, the + double flip sum 
+        a       = nl[rand.randint(0, nn-1)]                  # a randomly chosen negative-valued site
+        R, v    = Flip(R, a)                                 # flip it: returns the resulting R and -2a, the + double flip sum 
+        if observer is not None: observer(fc, a, R[a])       #   (report the flip)
         fc     += 1                                          # update flip count
         fs     += v                                          # update flip sum
     return fc, fs
 
 
+class RingProfile:
+    '''
+    Observer for RQ, RQFast and the Chart* loops, which call observer(step, site, value) on every event:
+    a flip of site (value is its new, positive value) or, with site = -1, a scan of the whole ring for
+    negative sites (value is how many it found). Counts both, keeps a per-site flip histogram, and splits
+    wall time by which kind of event ended each interval. Without an observer those loops pay only an
+    'is None' test per flip.
+    '''
+
+    def __init__(self, n):
+        self.flips, self.scans, self.histogram = 0, 0, [0]*n
+        self.time = {'scan': 0.0, 'flip': 0.0}
+        self.start()
+
+    def start(self):
+        '''begin timing from now'''
+        self.last = perf_counter()
+
+    def __call__(self, step, site, value):
+        now = perf_counter()
+        if site < 0:
+            self.scans += 1
+            self.time['scan'] += now - self.last
+        else:
+            self.flips += 1
+            self.histogram[site] += 1
+            self.time['flip'] += now - self.last
+        self.last = now
+
+    def report(self):
+        '''print the counters'''
+        print('flips ' + str(self.flips) + ', scans ' + str(self.scans))
+        for phase, t in self.time.items(): print('    ' + phase.ljust(6) + ('%.6f' % t) + ' s')
+        print('flips per site ' + str(self.histogram))
+
+
+class NegSites:
+    '''live set of the negative-valued site indices of R: O(1) update per site and O(1) uniform random choice'''
+
+    def __init__(self, R):
+        self.R = R
+        if hasattr(R, 'negatives'): self.sites = R.negatives()  # Ring and SparseRing list their own (a SparseRing
+        else: self.sites = [i for i in range(len(R)) if R[i] < 0]  #   without touching its zeros), in no particular order
+        self.where = {a: k for k, a in enumerate(self.sites)} #   ...and where each one sits in self.sites
+
+    def __len__(self):
+        return len(self.sites)
+
+    def update(self, a):
+        '''re-check site a of R after its value changed'''
+        if self.R[a] < 0:
+            if a not in self.where:
+                self.where[a] = len(self.sites)
+                self.sites.append(a)
+        elif a in self.where:                                # swap-remove: move the last site into a's slot
+            k, last = self.where.pop(a), self.sites.pop()
+            if last != a:
+                self.sites[k] = last
+                self.where[last] = k
+
+    def choice(self):
+        '''return a uniformly random negative site'''
+        return self.sites[rand.randrange(len(self.sites))]
+
+
+def RQFast(R, observer=None):
+    '''for R: resolve to Q exactly as RQ does, but track the negative sites incrementally; return fc, fs'''
+    n, neg = len(R), NegSites(R)
+    if observer is not None: observer(0, -1, len(neg))      # the only full scan
+    fc, fs = 0, 0
+    while len(neg):
+        a = neg.choice()
+        R, v = Flip(R, a)
+        for b in (a, kDec(a, n), kInc(a, n)): neg.update(b)  # only a and its two neighbours changed
+        if observer is not None: observer(fc, a, R[a])
+        fc += 1
+        fs += v
+    return fc, fs
+
+
+class SitePolicy:
+    '''
+    Base of the flip-selection policies used by RQPolicy. A policy is built from R, told through update(a)
+    whenever site a changes, and asked by choice() for the next (negative) site to flip; len() is the
+    number of negative sites. Subclasses keep their own structure current in changed(a, negative).
+    '''
+
+    def __init__(self, R):
+        self.R, self.n = R, len(R)
+        self.neg = [v < 0 for v in R]
+        self.count = sum(self.neg)
+
+    def __len__(self):
+        return self.count
+
+    def update(self, a):
+        now = self.R[a] < 0
+        self.count += now - self.neg[a]
+        self.neg[a] = now
+        self.changed(a, now)
+
+
+class LeftmostPolicy(SitePolicy):
+    '''flip the lowest-indexed negative site: a heap of sites, O(log n) per flip'''
+
+    def __init__(self, R):
+        super().__init__(R)
+        self.heap = [a for a in range(self.n) if self.neg[a]]
+        self.queued = list(self.neg)                         # is a in the heap (possibly as a stale entry)?
+
+    def changed(self, a, negative):
+        if negative and not self.queued[a]:
+            heappush(self.heap, a)
+            self.queued[a] = True
+
+    def choice(self):
+        while not self.neg[self.heap[0]]: self.queued[heappop(self.heap)] = False
+        return self.heap[0]
+
+
+class MostNegativePolicy(SitePolicy):
+    '''flip the most negative site (lowest index on ties): a heap keyed on site value, O(log n) per flip'''
+
+    def __init__(self, R):
+        super().__init__(R)
+        self.heap = [(R[a], a) for a in range(self.n) if self.neg[a]]
+        heapify(self.heap)
+
+    def changed(self, a, negative):
+        if negative: heappush(self.heap, (self.R[a], a))     # entries whose value is out of date are skipped later
+
+    def choice(self):
+        while self.R[self.heap[0][1]] != self.heap[0][0] or not self.neg[self.heap[0][1]]: heappop(self.heap)
+        return self.heap[0][1]
+
+
+class RoundRobinPolicy(SitePolicy):
+    '''sweep the ring: flip the first negative site at or after the last site flipped, wrapping around: O(log n) per flip'''
+
+    def __init__(self, R):
+        super().__init__(R)
+        self.ahead = [a for a in range(self.n) if self.neg[a]]  # heaps of the negative sites at/after and before the sweep
+        self.behind = []
+        self.queued = list(self.neg)
+        self.pointer = 0
+
+    def changed(self, a, negative):
+        if negative and not self.queued[a]:
+            heappush(self.ahead if a >= self.pointer else self.behind, a)
+            self.queued[a] = True
+
+    def choice(self):
+        while True:
+            if not self.ahead: self.ahead, self.behind, self.pointer = self.behind, [], 0
+            a = self.ahead[0]
+            if self.neg[a]:
+                self.pointer = a + 1
+                return a
+            self.queued[heappop(self.ahead)] = False
+
+
+def RQPolicy(R, policy=None, observer=None):
+    '''
+    for R: resolve to Q flipping the site chosen by policy (a class such as MostNegativePolicy, default the
+    uniformly random NegSites, as in RQ); return fc, fs. Which negative site is flipped first never changes
+    fc, fs or the quiescent ring reached (see FastForwardRQ), only the route and the time taken.
+    '''
+    n, P = len(R), (policy or NegSites)(R)
+    fc, fs = 0, 0
+    while len(P):
+        a = P.choice()
+        R, v = Flip(R, a)
+        for b in (a, kDec(a, n), kInc(a, n)): P.update(b)
+        if observer is not None: observer(fc, a, R[a])
+        fc += 1
+        fs += v
+    return fc, fs
+
+
+def FastForwardRQ(R):
+    '''
+    for R with sum S > 0: jump straight to the RQ outcome; R is set to its quiescent state and fc, fs are returned.
+    With partial sums P[k] = R[0] + ... + R[k-1], extended by P[k + n] = P[k] + S, flipping negative site a just
+    swaps P[a] and P[a+1] (and every periodic copy), so resolution is a bubble sort of P. Each inverted pair
+    P[i] > P[j], i < j, is swapped exactly once and adds 2*(P[i] - P[j]) to the flip sum; counting those pairs
+    and sorting P is O(n*n) however large the site values (and however many flips RQ would need). The pairs are
+    counted a block of rows at a time, so memory stays O(n) per row (some 50 MB in all at n = 10**5); for
+    rings too long for O(n*n) time with few nonzero sites, use SparseFastForwardRQ.
+    '''
+    n, S = len(R), sum(R)
+    if Q(R): return 0, 0
+    if S < 1: raise ValueError('a ring with sum ' + str(S) + ' never reaches Q')
+    P = np.concatenate([[0], np.cumsum(R[:-1])]).astype(object)
+    span = int(P.max() - P.min()) + S
+    dtype = np.int64 if n*n*2*span*(span//S + 2) < 2**62 else object
+    P = P.astype(dtype)
+    fc, fs, f = 0, 0, np.arange(n).astype(dtype)
+    rows = max(1, 2**20//n)                                  # rows i per block: a few MB per n-wide matrix
+    for lo in range(0, n, rows):
+        i = np.arange(lo, min(lo + rows, n))
+        d = P[i, None] - P[None, :]                          # d[i, j] = P[i] - P[j]
+        t0 = (i[:, None] >= np.arange(n)[None, :]).astype(dtype)  # least lift t with j + t*n after i
+        c = np.maximum(-((-d)//S) - t0, 0)                   # lifts t >= t0 with P[j] + t*S < P[i]: inversions
+        fc += int(c.sum())
+        fs += int((2*(c*d - S*(c*t0 + c*(c - 1)//2))).sum()) # 2*(d - t*S) summed over those lifts
+        f[i] += c.sum(axis=1)                                # final index of P[i]: + smaller after, - larger before
+        f -= c.sum(axis=0)
+    Qp = [0]*(n + 1)
+    for i in range(n): Qp[int(f[i]) % n] = int(P[i]) - S*(int(f[i])//n)
+    Qp[n] = Qp[0] + S
+    R[:] = [Qp[k + 1] - Qp[k] for k in range(n)]
+    return fc, fs
+
+
 def RPositives(R):
     '''for R: return a list of positive-valued indices'''
     return [i for i in range(len(R)) if R[i]  > 0]
@@ -227,30 +579,581 @@ def IncrementR(R, m, i):
     else: return R
 
 
-def GenerateAllPossibleRings(m, n):
+def LeastRotationIndex(R):
+    '''for R: return k such that R[k:] + R[:k] is the lexicographically least rotation of R: O(n) by Booth's algorithm'''
+    n = len(R)
+    if n == 0: return 0
+    S = list(R) + list(R)
+    f = [-1]*(2*n)                                           # failure function of the doubled sequence
+    k = 0                                                    # least rotation found so far
+    for j in range(1, 2*n):
+        sj, i = S[j], f[j - k - 1]
+        while i != -1 and sj != S[k + i + 1]:
+            if sj < S[k + i + 1]: k = j - i - 1
+            i = f[i]
+        if sj != S[k + i + 1]:                               # here i == -1
+            if sj < S[k]: k = j
+            f[j - k] = -1
+        else: f[j - k] = i + 1
+    return k % n
+
+
+def LeastRotation(R):
+    '''for R: return (as a tuple) the lexicographically least rotation of R'''
+    k = LeastRotationIndex(R)
+    return tuple(R[k:]) + tuple(R[:k])
+
+
+def CanonicalRing(R):
+    '''for R: return a hashable representative shared by every rotation and reflection of R (least of both chiralities)'''
+    return min(LeastRotation(R), LeastRotation(R[::-1]))
+
+
+def CanonicalOrientation(R):
+    '''for R: return CanonicalRing(R), k and rev such that rotating (R reversed if rev) left by k gives CanonicalRing(R)'''
+    k, kr = LeastRotationIndex(R), LeastRotationIndex(R[::-1])
+    fwd, rev = tuple(R[k:]) + tuple(R[:k]), tuple(R[::-1][kr:]) + tuple(R[::-1][:kr])
+    if rev < fwd: return rev, kr, True
+    return fwd, k, False
+
+
+def GenerateAllPossibleRings(m, n, S=1):
     '''
-    Return a list of all possible rings Rn with abs(site) <= m: Excluding cyclic/chiral degeneracy
+    Return a list of all possible rings Rn with abs(site) <= m and sum S: Excluding cyclic/chiral degeneracy
     '''
     L = []                  # To return L: A list of lists (rings)
-    R = [-m]*n              # An "all negative values" ring... has a bad sum
-    
+    seen = set()            # CanonicalRing() of every ring in L
+    for R in BoundedRings(n, m, S):               # only the rings with sum S, in odometer order
+        c = CanonicalRing(R)                      # c is shared by all rotations/reflections of R
+        if c not in seen:
+            seen.add(c)
+            L.append(R)
+    return L
+
+
+def IterAllPossibleRings(m, n, S=1):
+    '''
+    Yield one ring per rotation/reflection class with abs(site) <= m and sum S: the class's CanonicalRing, as a list.
+    Nothing is remembered between rings, so memory stays constant however many rings there are.
+    '''
+    for R in BoundedRings(n, m, S):
+        if tuple(R) == CanonicalRing(R): yield R
+
+
+def CanonicalShard(task):
+    '''for task = (m, n, S, tail): return the canonical rings (as in IterAllPossibleRings) whose last sites are tail'''
+    m, n, S, tail = task
+    return [R + tail for R in BoundedRings(n - len(tail), m, S - sum(tail)) if tuple(R + tail) == CanonicalRing(R + tail)]
+
+
+def ShardTasks(m, n, S, depth):
+    '''return the CanonicalShard tasks (m, n, S, tail) that split the rings on the values of their last depth sites'''
+    return [
+        (m, n, S, list(reversed(top)))                       # odometer order: site n-1 is the most significant
+        for top in product(range(-m, m + 1), repeat=depth)
+        if abs(S - sum(top)) <= (n - depth)*m
+    ]
+
+
+def ShardDepth(m, n, processes):
+    '''return a ShardTasks depth giving several shards per worker process'''
+    depth = 0
+    while depth < n and (2*m + 1)**depth < 8*processes: depth += 1
+    return depth
+
+
+def ParallelPossibleRings(m, n, S=1, processes=None, depth=None):
+    '''
+    Yield the same rings as IterAllPossibleRings(m, n, S), in the same order, enumerated on a process pool.
+    The space is split on the values of the last depth sites into disjoint shards; a ring's canonical form
+    does not depend on which shard finds it, so the shards never overlap and need no merging beyond
+    concatenation. Only one shard per worker is held in memory at a time.
+    '''
+    from multiprocessing import Pool, cpu_count             # only the parallel path needs it
+    processes = processes or cpu_count()
+    if depth is None: depth = ShardDepth(m, n, processes)
+    with Pool(processes) as pool:
+        for shard in pool.imap(CanonicalShard, ShardTasks(m, n, S, depth)):
+            yield from shard
+
+
+def CountPossibleRings(m, n, S=1):
+    '''
+    Return len(GenerateAllPossibleRings(m, n, S)) without enumerating: Burnside's lemma over the dihedral group.
+    Each rotation or reflection fixes exactly the rings that are constant on its cycles, and those are counted
+    as bounded compositions of S over the cycles (a cycle of length L contributes L times its one value).
+    '''
+    if n < 1: return 0
+    C = BoundedCompositionCounts(n, m)
+    def count(k, s):                                         # k-site vectors on [-m, m] with sum s
+        return C[k][s + k*m] if abs(s) <= k*m else 0
+    fixed = 0
+    for r in range(n):                                       # rotation by r: gcd(r, n) cycles of length n/gcd
+        g = gcd(r, n)
+        if S % (n//g) == 0: fixed += count(g, S//(n//g))
+    if n % 2:                                                # n reflections, each with 1 fixed site + (n-1)/2 pairs
+        fixed += n*sum(count((n-1)//2, (S - v)//2) for v in range(-m, m + 1) if (S - v) % 2 == 0)
+    else:                                                    # n/2 through two sites, n/2 through two edges
+        fixed += (n//2)*sum(count(2, a)*count((n-2)//2, (S - a)//2) for a in range(-2*m, 2*m + 1) if (S - a) % 2 == 0)
+        if S % 2 == 0: fixed += (n//2)*count(n//2, S//2)
+    return fixed//(2*n)
+
+
+def CheckCountPossibleRings(m_max, n_max, S=1):
+    '''Cross-check CountPossibleRings against brute-force enumeration for all m <= m_max, n <= n_max; return bool all agree'''
+    allAgree = True
+    for n in range(1, n_max + 1):
+        for m in range(1, m_max + 1):
+            counted, enumerated = CountPossibleRings(m, n, S), len(GenerateAllPossibleRings(m, n, S))
+            if not counted == enumerated:
+                print('    mismatch: m = ' + str(m) + ', n = ' + str(n) + ': ' + str(counted) + ' counted, ' + str(enumerated) + ' enumerated')
+                allAgree = False
+    return allAgree
+
+
+####
+####
+#
+# Memoized resolution
+#
+####
+####
+
+
+class RingCache:
+    '''
+    Bounded LRU memo of RQ and Entropy results keyed by CanonicalRing, so rotations and reflections of a ring
+    share one entry. fc, fs and the quiescent ring reached do not depend on the order of flips, and a rotated
+    or reflected ring resolves to the same rotation or reflection of that quiescent ring.
+    '''
+
+    def __init__(self, maxsize=2**16):
+        self.maxsize, self.hits, self.misses = maxsize, 0, 0
+        self.table = OrderedDict()
+
+    def __len__(self):
+        return len(self.table)
+
+    def lookup(self, key, compute):
+        '''return the cached value for key, computing (and perhaps evicting the least recently used entry) on a miss'''
+        if key in self.table:
+            self.hits += 1
+            self.table.move_to_end(key)
+            return self.table[key]
+        self.misses += 1
+        value = self.table[key] = compute()
+        if len(self.table) > self.maxsize: self.table.popitem(last=False)
+        return value
+
+    def rq(self, R):
+        '''RQ(R) from the cache: R is set to its quiescent state and fc, fs are returned'''
+        c, k, rev = CanonicalOrientation(R)
+        def resolve():
+            Rc = list(c)
+            fc, fs = RQ(Rc)
+            return fc, fs, tuple(Rc)
+        fc, fs, F = self.lookup(('RQ', c), resolve)
+        n = len(F)
+        F = F[n - k:] + F[:n - k]                            # undo the rotation...
+        if rev: F = F[::-1]                                  #   ...and the reflection
+        R[:] = F
+        return fc, fs
+
+    def entropy(self, R):
+        '''Entropy(R) from the cache'''
+        c = CanonicalRing(R)
+        return self.lookup(('Entropy', c), lambda: FastEntropy(c))
+
+    def clear(self):
+        self.table.clear()
+        self.hits, self.misses = 0, 0
+
+
+RingMemo = RingCache()                                       # the cache behind CachedRQ and CachedEntropy
+
+def CachedRQ(R):
+    '''RQ(R) through RingMemo'''
+    return RingMemo.rq(R)
+
+def CachedEntropy(R):
+    '''Entropy(R) through RingMemo'''
+    return RingMemo.entropy(R)
+
+
+####
+####
+#
+# Batch ring engine (NumPy)
+#
+####
+####
+
+
+def BatchRQ(Rs, seed=None):
+    '''for Rs, a 2D array of equal-length rings: resolve all to Q via random flips; return fc, fs and final rings
+
+    Each step flips one uniformly chosen negative site in every ring that is not yet quiescent, exactly as RQ
+    does for a single ring. Rs is not modified; seed may be an int or a numpy Generator.'''
+    A = np.array(Rs, dtype=np.int64)
+    if A.ndim == 1: A = A.reshape(1, -1)
+    nR, n = A.shape
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    fc = np.zeros(nR, dtype=np.int64)                        # per-ring flip count
+    fs = np.zeros(nR, dtype=np.int64)                        # per-ring flip sum
+    dec, inc = np.roll(np.arange(n), 1), np.roll(np.arange(n), -1)
+    live = np.arange(nR)                                     # A-row of each ring still being resolved...
+    W, Wfs = A.copy(), fs.copy()                             #   ...its working state and running flip sum
+    step = 0
+    while live.size:
+        p = np.flatnonzero(W < 0)                            # flat positions of all negative sites, grouped by ring
+        nn = np.bincount(p // n, minlength=live.size)        # number of negative sites per live ring
+        if not nn.all():                                     # retire the rings that reached Q
+            done = nn == 0
+            A[live[done]], fc[live[done]], fs[live[done]] = W[done], step, Wfs[done]
+            keep = ~done
+            live, W, Wfs, nn = live[keep], W[keep], Wfs[keep], nn[keep]
+            if not live.size: break
+            p = np.flatnonzero(W < 0)
+        j = (rng.random(live.size) * nn).astype(np.int64)    # which negative site (0-based, per ring) to flip...
+        k = p[np.cumsum(nn) - nn + j]                        #   ...as a flat position in W
+        base = k - k % n
+        a = k - base                                         # site index within each ring
+        Wf = W.reshape(-1)
+        v = -Wf[k]
+        Wf[k] = v
+        Wf[base + dec[a]] -= v
+        Wf[base + inc[a]] -= v
+        Wfs += 2*v
+        step += 1
+    return fc, fs, A
+
+
+def RoundRQ(R, observer=None):
+    '''
+    for R with sum S > 0: resolve to Q in synchronous rounds; R is set to its quiescent state and rounds, fc, fs
+    are returned. Each round flips, all at once with whole-array arithmetic, every negative site whose left
+    neighbour is non-negative: the first site of each run of negatives. No two of those are adjacent, so a round
+    is the same as flipping them one after another, and fc, fs and the final ring are those of RQ (see
+    FastForwardRQ). observer gets a flip event per site fired, as from RQFast.
+
+    R may be a list, numpy array, Ring or SparseRing. Rounds grow about as n*n on random rings: R_n(1000, 3)
+    takes some 40,000 rounds and a second (RQFast: 30 s, FastForwardRQ: 0.1 s), R_n(3000, 3) some 250,000
+    rounds. FastForwardRQ is O(n*n) too, if with a far smaller constant (R_n(20000, 3): some 10 s), so rings of
+    10**5 sites and more are out of reach of both unless most sites are 0; resolve those as a SparseRing with
+    SparseFastForwardRQ, which costs O(k*k) for k nonzero sites.
+    '''
+    if isinstance(R, SparseRing): A = np.array(R.dense(), dtype=object)
+    elif isinstance(R, (list, Ring, np.ndarray)): A = np.asarray(R, dtype=object)
+    else: raise TypeError('RoundRQ resolves a list, numpy array, Ring or SparseRing in place, not ' + type(R).__name__)
+    n, S = len(A), int(A.sum())
+    if not n or A.min() >= 0: return 0, 0, 0
+    if S < 1: raise ValueError('a ring with sum ' + str(S) + ' never reaches Q')
+    P = np.cumsum(A)
+    if int(P.max() - P.min()) + 2*S >= 2**62: raise OverflowError('site values could overflow int64')
+    W = A.astype(np.int64)                                   # sites stay within the span of the partial sums
+    rounds, fc, fs = 0, 0, 0
     while True:
-        Rt = R.copy()                                              # Rt is a trial ring, a copy of R (that we may need to reverse)
-        if not sum(Rt) == 1:                       goodR = False   # Check that Rt has sum 1
-        elif not (min(Rt) >= -m and max(Rt) <= m): goodR = False   #     ...and that all of Rt is in-bounds 
-        else: 
-            goodR = True                          # Rt has sum = 1, sites all in (-m, m)
-            for c in L:                           # c is sequence of rings from the existing L for comparison
-                if Congruent(Rt, c):
-                    goodR = False
-                    break
-                Rt.reverse()
-                if Congruent(Rt, c):
-                    goodR = False
+        neg = W < 0
+        fire = neg.copy()
+        fire[1:] &= ~neg[:-1]                                # skip a negative site whose left neighbour is negative
+        fire[0] &= ~neg[-1]
+        a = np.flatnonzero(fire)
+        if not a.size: break
+        v = -W[a]
+        W[a] = v
+        W[a - 1] -= v                                        # no two sites of a are adjacent, so neither index
+        W[(a + 1) % n] -= v                                  #   list repeats a site (a - 1 = -1 wraps to the end)
+        if observer is not None:
+            for k, (b, value) in enumerate(zip(a.tolist(), v.tolist())): observer(fc + k, b, value)
+        rounds += 1
+        fc += a.size
+        fs += 2*int(v.sum())
+    if isinstance(R, SparseRing): R.values = {int(i): int(W[i]) for i in np.flatnonzero(W)}
+    else: R[:] = W if isinstance(R, np.ndarray) else W.tolist()
+    return rounds, fc, fs
+
+
+def CheckRoundRQ(n, x, trials, S=1):
+    '''Cross-check RoundRQ on trials random (n, x, S) rings: fc, fs and final ring against RQ, and the drop in
+    Entropy, which is S*fs; return bool all agree'''
+    allAgree = True
+    for t in range(trials):
+        R = R_n_S(n, x, S)
+        R1, R2 = list(R), list(R)
+        rounds, fc, fs = RoundRQ(R1)
+        if (fc, fs) != RQFast(R2) or R1 != R2 or (n > 2 and FastEntropy(R) - FastEntropy(R1) != S*fs):
+            print('    mismatch: ' + str(R))
+            allAgree = False
+    return allAgree
+
+
+####
+####
+#
+# Compact ring type
+#
+####
+####
+
+
+SiteTypecodes = ('b', 'h', 'i', 'q')                        # array typecodes of 1, 2, 4 and 8-byte sites
+
+
+def SiteTypecode(R):
+    '''smallest SiteTypecodes entry holding every site of R and, with room to spare, those it passes through
+    on the way to Q (they stay within the span of R's partial sums, plus the sum)'''
+    P, lo, hi, top = 0, 0, 0, 0
+    for v in R:
+        P += v
+        lo, hi, top = min(lo, P), max(hi, P), max(top, abs(v))
+    bound = max(top, hi - lo + 2*abs(P))
+    for t in SiteTypecodes:
+        if bound < 2**(8*array(t).itemsize - 1): return t
+    raise OverflowError('site values too large for an 8-byte array')
+
+
+class Ring:
+    '''
+    A ring stored as a typed array of the smallest integer type that holds it (see SiteTypecode): one or two
+    bytes per site for the usual rings (R_n(10**5, 20) takes 200 kB, its list 800 kB of pointers alone). A
+    write that does not fit widens the array. n and the site sum S are kept current, so nothing needs len(R) or sum(R). A
+    Ring indexes like a list, so RQ, Flip, Entropy and the cost functions accept one as is. np.asarray(R)
+    shares its buffer without copying, and R.sites is the buffer itself (memoryview(R.sites) works on any
+    Python; memoryview(R) would need Python 3.12's __buffer__, so it is not offered).
+    '''
+    __slots__ = ('sites', 'n', 'S')
+
+    def __init__(self, values=(), typecode=None):
+        values = list(values)
+        self.sites = array(typecode or SiteTypecode(values), values)
+        self.n, self.S = len(self.sites), sum(self.sites)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.sites)
+
+    def __getitem__(self, i):
+        return self.sites[i]
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            sites = self.sites.tolist()
+            sites[i] = value
+            t = SiteTypecode(sites)
+            if self.sites.typecode in SiteTypecodes: t = max(t, self.sites.typecode, key=SiteTypecodes.index)
+            self.sites = array(t, sites)
+            self.n, self.S = len(self.sites), sum(self.sites)
+        else:
+            old = self.sites[i]
+            while True:
+                try:
+                    self.sites[i] = value
                     break
-        if goodR: L.append(R[:])                  # Rt may at this point be reversed; so append R 
-        R = IncrementR(R, m, 0)                   # Always attempt the odometer increase of R at site 0
-        if not R: return L                        #    returns False when no more increments are possible
+                except OverflowError: self.widen()
+            self.S += value - old
+
+    def __eq__(self, other):
+        return list(self.sites) == list(other)
+
+    def __repr__(self):
+        return 'Ring(' + str(list(self.sites)) + ')'
+
+    def __array__(self, dtype=None, copy=None):
+        A = np.frombuffer(self.sites, dtype=np.dtype(self.sites.typecode))
+        if copy: return A.astype(dtype or A.dtype)           # np.array(R): a fresh, writable array
+        A.flags.writeable = False                            # a shared view: writes must go through the Ring to keep S current
+        return A if dtype is None else A.astype(dtype, copy=False)
+
+    def widen(self):
+        '''move the sites to the next larger SiteTypecodes array'''
+        t = self.sites.typecode
+        if t == SiteTypecodes[-1] or t not in SiteTypecodes: raise OverflowError('site values too large for an 8-byte array')
+        self.sites = array(SiteTypecodes[SiteTypecodes.index(t) + 1], self.sites)
+
+    def copy(self):
+        R = Ring.__new__(Ring)
+        R.sites, R.n, R.S = array(self.sites.typecode, self.sites), self.n, self.S
+        return R
+
+    def flip(self, a):
+        '''flip site a in place (as Flip does); return the flip 'double-positive' value'''
+        sites, n = self.sites, self.n
+        v = -sites[a]
+        if v > 0:                                            # the sum is unchanged: +2v at a, -v at each neighbour
+            left, right = a - 1, (a + 1) % n
+            old = sites[a], sites[left], sites[right]
+            try:
+                sites[a] = v
+                sites[left] -= v
+                sites[right] -= v
+            except OverflowError:                            # undo (in reverse, for n < 3), widen and flip again
+                sites[right], sites[left], sites[a] = old[2], old[1], old[0]
+                self.widen()
+                return self.flip(a)
+        return 2*v
+
+    def flipped(self, a):
+        '''return a copy of this ring with site a flipped; this ring is untouched'''
+        R = self.copy()
+        R.flip(a)
+        return R
+
+    def reverse_flipped(self, i):
+        '''return a copy of this ring with site i reverse-flipped (as ReverseFlip does)'''
+        R = self.copy()
+        a, n = R.sites[i], R.n
+        R[i] = -a                                            # through __setitem__, which widens when needed
+        R[i - 1] += a
+        R[(i + 1) % n] += a
+        return R
+
+    def negatives(self):
+        '''return a list of the negative-valued site indices'''
+        return [i for i, v in enumerate(self.sites) if v < 0]
+
+    def quiescent(self):
+        '''bool: are all sites non-negative?'''
+        return min(self.sites, default=0) >= 0
+
+
+####
+####
+#
+# Sparse ring type
+#
+####
+####
+
+
+class SparseRing:
+    '''
+    A ring of n sites that stores only its nonzero sites, as a dict index -> value; memory and every scan
+    are proportional to the number of nonzero sites, not to n. Indexing reads and writes single sites as a
+    list would (absent sites read 0), so Flip and RQFast work on a SparseRing as is, and RQFast then costs
+    a few dict operations per flip. SparseFastForwardRQ resolves one without flipping at all.
+    '''
+    __slots__ = ('values', 'n', 'S')
+
+    def __init__(self, n, values=()):
+        self.n, self.values = n, {}
+        items = values.items() if isinstance(values, dict) else values
+        for i, v in items:
+            if v: self.values[i % n] = self.values.get(i % n, 0) + v
+        self.values = {i: v for i, v in self.values.items() if v}
+        self.S = sum(self.values.values())
+
+    @classmethod
+    def from_dense(cls, R):
+        '''return the SparseRing of the list (or array, or Ring) R'''
+        return cls(len(R), [(i, v) for i, v in enumerate(R) if v])
+
+    def dense(self):
+        '''return this ring as a list of n sites'''
+        R = [0]*self.n
+        for i, v in self.values.items(): R[i] = v
+        return R
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.dense())
+
+    def __getitem__(self, i):
+        return self.values.get(i % self.n, 0)
+
+    def __setitem__(self, i, value):
+        i %= self.n
+        self.S += value - self.values.get(i, 0)
+        if value: self.values[i] = value
+        else: self.values.pop(i, None)
+
+    def __eq__(self, other):
+        if isinstance(other, SparseRing): return self.n == other.n and self.values == other.values
+        return self.dense() == list(other)
+
+    def __repr__(self):
+        return 'SparseRing(' + str(self.n) + ', ' + str(self.items()) + ')'
+
+    def items(self):
+        '''return the nonzero sites as a list of (index, value), in index order'''
+        return sorted(self.values.items())
+
+    def copy(self):
+        R = SparseRing.__new__(SparseRing)
+        R.values, R.n, R.S = dict(self.values), self.n, self.S
+        return R
+
+    def flip(self, a):
+        '''flip site a in place (as Flip does); return the flip 'double-positive' value'''
+        v = -self.values.get(a, 0)
+        if v > 0:                                            # only a and its two neighbours change
+            self[a] = v
+            self[a - 1] -= v
+            self[a + 1] -= v
+        return 2*v
+
+    def negatives(self):
+        '''return a list of the negative-valued site indices'''
+        return [i for i, v in self.values.items() if v < 0]
+
+    def quiescent(self):
+        '''bool: are all sites non-negative?'''
+        return min(self.values.values(), default=0) >= 0
+
+    def entropy(self):
+        '''return Entropy of this ring, summing over the nonzero sites only (see FastEntropy)'''
+        n, E, P0, P1, P2 = self.n, 0, 0, 0, 0
+        for j, v in self.items():
+            E += v*((j*j - n*j)*P0 + (n - 2*j)*P1 + P2)
+            P0, P1, P2 = P0 + v, P1 + j*v, P2 + j*j*v
+        return E
+
+
+def SparseFastForwardRQ(R):
+    '''
+    for SparseRing R with sum S > 0: set R to its quiescent state and return fc, fs, as FastForwardRQ does.
+    The partial sums P are constant between nonzero sites, so they form k + 1 runs for k nonzero sites; the
+    inversions between two runs all have the same size, and each run moves as a block when P is sorted.
+    Time is O(k*k), whatever n and the site values.
+    '''
+    n, S = R.n, R.S
+    if R.quiescent(): return 0, 0
+    if S < 1: raise ValueError('a ring with sum ' + str(S) + ' never reaches Q')
+    runs, start, P = [], 0, 0                                # (first index, length, P) of each run of P
+    for i, v in R.items():
+        runs.append((start, i + 1 - start, P))
+        start, P = i + 1, P + v
+    runs.append((start, n - start, P))
+    runs = [run for run in runs if run[1]]
+    fc, fs, shift = 0, 0, [0]*len(runs)
+    for A, (startA, LA, PA) in enumerate(runs):
+        for B, (startB, LB, PB) in enumerate(runs):
+            d = PA - PB
+            if d <= 0: continue
+            t0 = 1 if A > B else 0                           # least lift of run B that lies after run A
+            c = max(-(-d//S) - t0, 0)                        # lifts t >= t0 with PB + t*S < PA
+            if not c: continue
+            w = LA*LB
+            fc += w*c
+            fs += w*2*(c*d - S*(c*t0 + c*(c - 1)//2))
+            shift[A] += LB*c                                 # A passes c copies of B on its way right...
+            shift[B] -= LA*c                                 #   ...and B passes c copies of A going left
+    segments = []                                            # (first index, P) of the sorted P, cut at multiples of n
+    for (start, L, P), s in zip(runs, shift):
+        f = start + s
+        while L:
+            lift, first = divmod(f, n)
+            m = min(L, n - first)
+            segments.append((first, P - S*lift))
+            f, L = f + m, L - m
+    segments.sort()
+    values = [(first - 1, P - prev) for (prev_first, prev), (first, P) in zip(segments, segments[1:])]
+    values.append((n - 1, segments[0][1] + S - segments[-1][1]))
+    R.values = {i: v for i, v in values if v}
+    return fc, fs
 
 
 ######
@@ -288,7 +1191,7 @@ def AbsCost(R, delta):
 
 def ECost(R): 
     '''Cost function is the Entropy() function'''
-    return Entropy(R)
+    return FastEntropy(R)
 
 
 def AllHorseCollarsCost(R):
@@ -324,6 +1227,85 @@ def ScholesCost(R):
             cost += fabs(this_sum)
     return cost
 
+def FastAllHorseCollarsCost(R):
+    '''AllHorseCollarsCost(R) in O(n): each all-but-one sum is sum(R) minus that site; R may be a 2D array of rings'''
+    A = np.asarray(R, dtype=np.int64)
+    T = A.sum(axis=-1, keepdims=True)
+    cost = np.abs(T - A).sum(axis=-1).astype(float)
+    return cost if cost.ndim else float(cost)
+
+
+def FastOneHorseCollarCost(R, a):
+    '''OneHorseCollarCost(R, a) in O(1) given sum(R); R may be a 2D array of rings'''
+    A = np.asarray(R, dtype=np.int64)
+    this_sum = A.sum(axis=-1) - A[..., a]
+    return this_sum if this_sum.ndim else int(this_sum)
+
+
+def FastScholesCost(R):
+    '''ScholesCost(R) in O(n*n) vectorized: every arc sum is a difference of two circular prefix sums; R may be a 2D array of rings'''
+    A = np.asarray(R, dtype=np.int64)
+    n = A.shape[-1]
+    P = np.zeros(A.shape[:-1] + (2*n + 1,), dtype=np.int64)  # prefix sums of R repeated twice, so arcs may wrap
+    np.cumsum(np.concatenate([A, A], axis=-1), axis=-1, out=P[..., 1:])
+    cost = np.zeros(A.shape[:-1], dtype=np.int64)
+    for L in range(1, n):                                    # arcs of L sites starting at each i: P[i+L] - P[i]
+        cost += np.abs(P[..., L:L + n] - P[..., :n]).sum(axis=-1)
+    cost = cost.astype(float)
+    return cost if cost.ndim else float(cost)
+
+
+class CostTracker:
+    '''
+    Follow cost functions of R along a flip sequence, updating each by a delta instead of recomputing it.
+    costs is a list of cost functions, with (CCost, delta) / (AbsCost, delta) pairs for the two-argument ones.
+    A flip at a changes only sites a-1, a, a+1 (and never the ring sum), so CCost, AbsCost and
+    AllHorseCollarsCost change in O(1) terms, Entropy changes by exactly -2*v*sum(R) for a flip of value v (n > 2),
+    and ScholesCost changes only in the O(n) arcs that start or end on a changed site. Any other cost
+    function is recomputed in full after each flip.
+    '''
+
+    def __init__(self, R, costs, record=False):
+        self.R, self.n, self.S = R, len(R), sum(R)
+        self.costs = [c if isinstance(c, tuple) else (c,) for c in costs]
+        self.values = [c[0](R, *c[1:]) for c in self.costs]
+        self.history = [list(self.values)] if record else None
+
+    def flip(self, a):
+        '''Flip site a of R (as Flip does) and bring every tracked cost up to date; return the flip 'double-positive' value'''
+        R, n = self.R, self.n
+        if R[a] >= 0: return -2*R[a]                         # Flip leaves R unchanged
+        T = {kDec(a, n), a, kInc(a, n)}                      # the sites this flip changes
+        before = [self.local(c, T) for c in self.costs]
+        R, v = Flip(R, a)
+        for k, c in enumerate(self.costs):
+            if c[0] in (Entropy, ECost, FastEntropy) and n > 2: self.values[k] -= v*self.S
+            elif before[k] is not None: self.values[k] += self.local(c, T) - before[k]
+            else: self.values[k] = c[0](R, *c[1:])
+        if self.history is not None: self.history.append(list(self.values))
+        return v
+
+    def local(self, c, T):
+        '''sum of the terms of cost c that involve any site in T (None if c is not decomposable this way)'''
+        R, n, f = self.R, self.n, c[0]
+        if f in (CCost, AbsCost):
+            g = (lambda d: d*d) if f is CCost else fabs
+            return sum(g(R[i] - R[(i + c[1]) % n]) for i in {(t - k) % n for t in T for k in (0, c[1])})
+        if f is AllHorseCollarsCost:                         # term for site t is fabs(sum of all sites but t)
+            return sum(fabs(self.S - R[t]) for t in T)
+        if f is ScholesCost:
+            arcs = {}                                        # (start, length) -> arc sum, for arcs touching T at an end
+            for t in T:
+                fwd = bwd = 0
+                for L in range(1, n):
+                    fwd += R[(t + L - 1) % n]
+                    bwd += R[(t - L + 1) % n]
+                    arcs[(t, L)] = fwd
+                    arcs[((t - L + 1) % n, L)] = bwd
+            return sum(fabs(x) for x in arcs.values())
+        return None
+
+
 ####
 ####
 #
@@ -364,21 +1346,8 @@ def PrintPossible(m_max, n):
     '''Print how many non-degenerate ring configurations exist for a given size n and site constraint m'''
     print('For ring size ' + str(n) + '...')
     for m in range(1, m_max + 1):
-        p = GenerateAllPossibleRings(m, n)
-        print('       constraint ' + str(m) + ' yields ' + str(len(p)) + ' possible rings')
-
-
-def ChartIMO1986_3_solution_cost(n, x):
-    '''For a ring of size n with max site value x: Chart to olympiad solution cost function'''
-    R = R_n(n, x)
-    c = []
-    while not IsQuiescent(R):
-        c.append(CCost(R, 2))
-        nn, nl  = NegList(R)                                 # the number and list of negative sites
-        R, v    = Flip(R, nl[rand.randint(0, nn-1)])         # execute a flip at a random negative site
-    fig,ax=plt.subplots(figsize=(6,4))
-    ax.plot(c)
-    ax.set(title='Ring cost function with flips: Olympiad solution')
+        p = CountPossibleRings(m, n)
+        print('       constraint ' + str(m) + ' yields ' + str(p) + ' possible rings')
 
 
 def CompareEntropyFormulaToEmpirical(n1, n2, n_trials, x):
@@ -397,61 +1366,6 @@ def CompareEntropyFormulaToEmpirical(n1, n2, n_trials, x):
     return
 
 
-def ChartEntropyCostFunction(n, x):
-    '''For a ring of size n with max site value x: Chart to olympiad solution cost function'''
-    R = R_n(n, x)
-    c = []
-    while not IsQuiescent(R):
-        c.append(ECost(R))
-        nn, nl  = NegList(R)                                 # the number and list of negative sites
-        R, v    = Flip(R, nl[rand.randint(0, nn-1)])         # execute a flip at a random negative site
-    fig,ax=plt.subplots(figsize=(6,4))
-    ax.plot(c)
-    ax.set(title='Ring entropy (cost function) with flips')
-
-
-def ChartsToInvestigateHorseCollarCostFunctions(n, x):
-    '''Compares horse collar cost function ideas'''
-    R = R_n(n, x)
-    c, d = [], []
-    while True:
-        nn, nl  = NegList(R)
-        negsite = rand.randint(0, nn - 1)
-        c.append(AllHorseCollarsCost(R))
-        d.append(OneHorseCollarCost(R, nl[negsite]))
-        R, v    = Flip(R, nl[negsite])
-        c.append(AllHorseCollarsCost(R))
-        d.append(OneHorseCollarCost(R, nl[negsite]))
-        if IsQuiescent(R): break
-    
-    fig,ax=plt.subplots(figsize=(6,4))
-    ax.plot(c)
-    ax.set(title='All horse collars')
-    
-    fig,ax=plt.subplots(figsize=(6,4))
-    ax.plot(d)
-    ax.set(title='One horse collar')     
-
-    
-def ChartScholesCostFunction(n, x):
-    '''Chart of the Scholes cost function over flips'''
-    R = R_n(n, x)
-    c = [ScholesCost(R)]
-    while True:
-        nn, nl  = NegList(R)
-        negsite = rand.randint(0, nn - 1)
-        R, v    = Flip(R, nl[negsite])
-        this_cost = ScholesCost(R)
-        c.append(this_cost)
-        nn, nl  = NegList(R)
-        if nn == 0: break
-    fig,ax=plt.subplots(figsize=(6,4))
-    ax.plot(c)
-    ax.set(title='Scholes Cost Function')
-    ax.set_xlabel('successive flips')
-    ax.set_ylabel('A(R)')
-    print(R)
-   
 def PrintScholesDeltaTable(spacer, min_a1, max_S):
     print()
     print("Scholes cost function (generalized) produces this table of A(R') - A(R) values")
@@ -466,3 +1380,20 @@ def PrintScholesDeltaTable(spacer, min_a1, max_S):
             msg += padnum(fabs(S + a1) - fabs(S - a1), spacer)
         print(msg)
 
+
+####
+####
+#
+# Plotting lives in ringplot (which imports matplotlib); its Chart* functions load on first use
+#
+####
+####
+
+PlotFunctions = ('ChartIMO1986_3_solution_cost', 'ChartEntropyCostFunction',
+                 'ChartsToInvestigateHorseCollarCostFunctions', 'ChartScholesCostFunction')
+
+def __getattr__(name):
+    if name in PlotFunctions:
+        import ringplot
+        return getattr(ringplot, name)
+    raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
@@ -0,0 +1,93 @@
+import matplotlib.pyplot as plt
+from ringmodule import R_n, NegSites, kDec, kInc, OneHorseCollarCost, CCost, ECost, AllHorseCollarsCost, \
+    ScholesCost, CostTracker
+
+
+####
+####
+#
+# Charts of cost functions along a flip sequence (ringmodule loads these on first use)
+#
+#   Each loop flips a uniformly random negative site as RQ does, keeping the negative sites in a NegSites
+#   (as RQFast does) so that a flip costs O(1) plus the tracked cost updates, not a scan of the ring.
+#
+####
+####
+
+
+def ChartIMO1986_3_solution_cost(n, x, observer=None):
+    '''For a ring of size n with max site value x: Chart to olympiad solution cost function'''
+    R = R_n(n, x)
+    t = CostTracker(R, [(CCost, 2)])
+    c, n, neg = [], len(R), NegSites(R)
+    if observer is not None: observer(0, -1, len(neg))      # the only full scan
+    while len(neg):
+        c.append(t.values[0])
+        a = neg.choice()
+        t.flip(a)                                            # execute a flip at a random negative site
+        for b in (a, kDec(a, n), kInc(a, n)): neg.update(b)  # only a and its two neighbours changed
+        if observer is not None: observer(len(c) - 1, a, R[a])
+    fig,ax=plt.subplots(figsize=(6,4))
+    ax.plot(c)
+    ax.set(title='Ring cost function with flips: Olympiad solution')
+
+
+def ChartEntropyCostFunction(n, x, observer=None):
+    '''For a ring of size n with max site value x: Chart to olympiad solution cost function'''
+    R = R_n(n, x)
+    t = CostTracker(R, [ECost])
+    c, n, neg = [], len(R), NegSites(R)
+    if observer is not None: observer(0, -1, len(neg))      # the only full scan
+    while len(neg):
+        c.append(t.values[0])
+        a = neg.choice()
+        t.flip(a)                                            # execute a flip at a random negative site
+        for b in (a, kDec(a, n), kInc(a, n)): neg.update(b)  # only a and its two neighbours changed
+        if observer is not None: observer(len(c) - 1, a, R[a])
+    fig,ax=plt.subplots(figsize=(6,4))
+    ax.plot(c)
+    ax.set(title='Ring entropy (cost function) with flips')
+
+
+def ChartsToInvestigateHorseCollarCostFunctions(n, x, observer=None):
+    '''Compares horse collar cost function ideas'''
+    R = R_n(n, x)
+    t = CostTracker(R, [AllHorseCollarsCost])
+    c, d, n, neg = [], [], len(R), NegSites(R)
+    if observer is not None: observer(0, -1, len(neg))
+    while len(neg):
+        a = neg.choice()
+        c.append(t.values[0])
+        d.append(OneHorseCollarCost(R, a))
+        t.flip(a)
+        for b in (a, kDec(a, n), kInc(a, n)): neg.update(b)
+        if observer is not None: observer(len(c)//2, a, R[a])
+        c.append(t.values[0])
+        d.append(OneHorseCollarCost(R, a))
+    
+    fig,ax=plt.subplots(figsize=(6,4))
+    ax.plot(c)
+    ax.set(title='All horse collars')
+    
+    fig,ax=plt.subplots(figsize=(6,4))
+    ax.plot(d)
+    ax.set(title='One horse collar')
+
+
+def ChartScholesCostFunction(n, x, observer=None):
+    '''Chart of the Scholes cost function over flips'''
+    R = R_n(n, x)
+    t = CostTracker(R, [ScholesCost], record=True)
+    n, neg = len(R), NegSites(R)
+    if observer is not None: observer(0, -1, len(neg))
+    while len(neg):
+        a = neg.choice()
+        t.flip(a)
+        for b in (a, kDec(a, n), kInc(a, n)): neg.update(b)
+        if observer is not None: observer(len(t.history) - 2, a, R[a])
+    fig,ax=plt.subplots(figsize=(6,4))
+    ax.plot([h[0] for h in t.history])
+    ax.set(title='Scholes Cost Function')
+    ax.set_xlabel('successive flips')
+    ax.set_ylabel('A(R)')
+    print(R)
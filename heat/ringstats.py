@@ -0,0 +1,173 @@
+from math import sqrt
+import numpy as np
+
+
+####
+####
+#
+# Streaming statistics for experiment sweeps
+#
+#   Each accumulator takes samples one at a time (add) or a chunk at a time (add_array), holds a fixed
+#   amount of state however many samples it has seen, and merges with another of its kind built from other
+#   samples (another chunk, another worker) to give what one accumulator fed both sets would hold.
+#
+####
+####
+
+
+class Moments:
+    '''
+    count, mean and variance by Welford's update; merge combines two by Chan's pairwise formula. Merged and
+    sequential results agree to float rounding; count and the integer total are exact.
+    '''
+
+    def __init__(self):
+        self.count, self.mean, self.M2, self.total = 0, 0.0, 0.0, 0
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        d = x - self.mean
+        self.mean += d/self.count
+        self.M2 += d*(x - self.mean)
+
+    def add_array(self, xs):
+        '''add every sample of xs (a chunk's mean and spread are found with numpy, then merged)'''
+        xs = np.asarray(xs)
+        if not xs.size: return
+        chunk = Moments()
+        chunk.count, chunk.mean = int(xs.size), float(xs.mean())
+        chunk.M2 = float(((xs - chunk.mean)**2).sum())
+        chunk.total = int(xs.sum(dtype=object)) if xs.dtype.kind in 'iu' else float(xs.sum())
+        self.merge(chunk)
+
+    def merge(self, other):
+        '''fold other's samples into this accumulator; return self'''
+        if not other.count: return self
+        count = self.count + other.count
+        d = other.mean - self.mean
+        self.mean += d*other.count/count
+        self.M2 += other.M2 + d*d*self.count*other.count/count
+        self.count, self.total = count, self.total + other.total
+        return self
+
+    def variance(self, ddof=1):
+        '''sample variance (ddof=1) or population variance (ddof=0); nan with too few samples'''
+        return self.M2/(self.count - ddof) if self.count > ddof else float('nan')
+
+    def std(self, ddof=1):
+        return sqrt(self.variance(ddof))
+
+    def __repr__(self):
+        return 'Moments(count=' + str(self.count) + ', mean=' + ('%.6g' % self.mean) + ', std=' + ('%.6g' % self.std()) + ')'
+
+
+class Histogram:
+    '''counts over bins equal-width bins on [lo, hi); samples outside land in the under and over counts'''
+
+    def __init__(self, lo, hi, bins):
+        if not hi > lo or bins < 1: raise ValueError('a histogram needs lo < hi and at least one bin')
+        self.lo, self.hi, self.bins = lo, hi, bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.under, self.over = 0, 0
+
+    def edges(self):
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    def add(self, x):
+        self.add_array([x])
+
+    def add_array(self, xs):
+        xs = np.asarray(xs, dtype=np.float64)
+        below, above = xs < self.lo, xs >= self.hi
+        self.under += int(below.sum())
+        self.over += int(above.sum())
+        k = ((xs[~below & ~above] - self.lo)*(self.bins/(self.hi - self.lo))).astype(np.int64)
+        self.counts += np.bincount(np.minimum(k, self.bins - 1), minlength=self.bins)
+
+    def merge(self, other):
+        '''add other's counts to these (the bins must be the same); return self'''
+        if (self.lo, self.hi, self.bins) != (other.lo, other.hi, other.bins):
+            raise ValueError('only histograms with the same bins merge')
+        self.counts += other.counts
+        self.under, self.over = self.under + other.under, self.over + other.over
+        return self
+
+    def total(self):
+        return int(self.counts.sum()) + self.under + self.over
+
+    def quantile(self, q):
+        '''estimate the q-quantile, interpolating linearly within its bin (clipped to [lo, hi])'''
+        target = q*self.total()
+        if target <= self.under: return self.lo
+        cum = self.under + np.cumsum(self.counts)
+        k = int(np.searchsorted(cum, target))
+        if k == self.bins: return self.hi
+        before = cum[k] - self.counts[k]
+        width = (self.hi - self.lo)/self.bins
+        return self.lo + width*(k + (target - before)/self.counts[k])
+
+
+class Extremes:
+    '''smallest and largest sample seen, each with the ring (or any tag) that produced it first'''
+
+    def __init__(self):
+        self.min, self.max, self.argmin, self.argmax = None, None, None, None
+
+    def add(self, x, R=None):
+        if self.min is None or x < self.min: self.min, self.argmin = x, None if R is None else list(R)
+        if self.max is None or x > self.max: self.max, self.argmax = x, None if R is None else list(R)
+
+    def add_array(self, xs, Rs=None):
+        '''add every sample of xs; Rs, if given, holds the ring of each sample as its rows'''
+        xs = np.asarray(xs)
+        if not xs.size: return
+        i, j = int(xs.argmin()), int(xs.argmax())
+        self.add(xs[i].item(), None if Rs is None else [int(v) for v in Rs[i]])
+        self.add(xs[j].item(), None if Rs is None else [int(v) for v in Rs[j]])
+
+    def merge(self, other):
+        '''fold in other's extremes; on a tie, this accumulator's ring is kept; return self'''
+        if other.min is not None:
+            self.add(other.min, other.argmin)
+            self.add(other.max, other.argmax)
+        return self
+
+    def __repr__(self):
+        return 'Extremes(min=' + str(self.min) + ' at ' + str(self.argmin) + ', max=' + str(self.max) + ' at ' + str(self.argmax) + ')'
+
+
+class Summary:
+    '''Moments, Extremes and optionally a Histogram of one quantity, fed and merged together'''
+
+    def __init__(self, bins=None):
+        self.moments, self.extremes = Moments(), Extremes()
+        self.histogram = Histogram(*bins) if bins is not None else None
+
+    def add(self, x, R=None):
+        self.moments.add(x)
+        self.extremes.add(x, R)
+        if self.histogram is not None: self.histogram.add(x)
+
+    def add_array(self, xs, Rs=None):
+        self.moments.add_array(xs)
+        self.extremes.add_array(xs, Rs)
+        if self.histogram is not None: self.histogram.add_array(xs)
+
+    def merge(self, other):
+        '''fold in other's samples (both with a histogram over the same bins, or neither); return self'''
+        if (self.histogram is None) != (other.histogram is None):
+            raise ValueError('only histograms with the same bins merge')
+        self.moments.merge(other.moments)
+        self.extremes.merge(other.extremes)
+        if self.histogram is not None: self.histogram.merge(other.histogram)
+        return self
+
+    def report(self, name):
+        '''print a one-line summary (and the quartiles, with a histogram)'''
+        m, e = self.moments, self.extremes
+        line = '  ' + name.ljust(4) + ' count ' + str(m.count) + ', mean ' + ('%.6g' % m.mean) + ', std ' + ('%.6g' % m.std())
+        line += ', min ' + str(e.min) + ' ' + str(e.argmin) + ', max ' + str(e.max) + ' ' + str(e.argmax)
+        if self.histogram is not None:
+            line += ', quartiles ' + ', '.join('%.6g' % self.histogram.quantile(q) for q in (0.25, 0.5, 0.75))
+        print(line)
@@ -0,0 +1,88 @@
+import json, os
+import numpy as np
+import ringmodule as ring
+
+
+####
+####
+#
+# On-disk store of enumerated ring families
+#
+#   Each (m, n, S) family, one canonical ring per rotation/reflection class as IterAllPossibleRings yields
+#   them, is kept as an .npy array of the smallest integer type that holds m (int8 up to m = 127), listed
+#   in index.json. Families are loaded memory-mapped, so nothing is read until it is used.
+#
+####
+####
+
+
+DefaultRoot = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ringfamilies')
+
+
+def SiteType(m):
+    '''smallest numpy integer type holding every value on [-m, m]'''
+    for t in (np.int8, np.int16, np.int32):
+        if m <= np.iinfo(t).max: return np.dtype(t)
+    return np.dtype(np.int64)
+
+
+def FamilyKey(m, n, S):
+    return str(m) + ',' + str(n) + ',' + str(S)
+
+
+def LoadIndex(root=DefaultRoot):
+    '''return the store's index: family key -> {file, count, dtype}'''
+    path = os.path.join(root, 'index.json')
+    if not os.path.exists(path): return {}
+    with open(path) as f: return json.load(f)
+
+
+def SaveIndex(index, root=DefaultRoot):
+    path = os.path.join(root, 'index.json')
+    with open(path + '.part', 'w') as f: json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(path + '.part', path)
+
+
+def StoreFamily(m, n, S=1, root=DefaultRoot, processes=1):
+    '''
+    enumerate the (m, n, S) family into the store and return its path. The file is sized up front from
+    CountPossibleRings and filled as rings are enumerated (on a process pool when processes != 1), so the
+    family never has to fit in memory as Python lists.
+    '''
+    os.makedirs(root, exist_ok=True)
+    name = 'm' + str(m) + '_n' + str(n) + '_S' + str(S) + '.npy'
+    path = os.path.join(root, name)
+    count = ring.CountPossibleRings(m, n, S)
+    A = np.lib.format.open_memmap(path + '.part', mode='w+', dtype=SiteType(m), shape=(count, n))
+    rings = ring.IterAllPossibleRings(m, n, S) if processes == 1 else ring.ParallelPossibleRings(m, n, S, processes)
+    k, block = 0, []
+    for R in rings:
+        block.append(R)
+        if len(block) == 4096:                               # copy into the map a block at a time
+            A[k:k + len(block)] = block
+            k, block = k + len(block), []
+    if block: A[k:k + len(block)] = block
+    k += len(block)
+    if k != count: raise RuntimeError('enumerated ' + str(k) + ' rings but CountPossibleRings gives ' + str(count))
+    A.flush()
+    del A
+    os.replace(path + '.part', path)
+    index = LoadIndex(root)
+    index[FamilyKey(m, n, S)] = {'file': name, 'count': count, 'dtype': SiteType(m).name}
+    SaveIndex(index, root)
+    return path
+
+
+def LoadFamily(m, n, S=1, root=DefaultRoot, build=True, processes=1):
+    '''return the (m, n, S) family as a read-only memory-mapped (count, n) array, storing it first if need be'''
+    entry = LoadIndex(root).get(FamilyKey(m, n, S))
+    if entry is None:
+        if not build: raise KeyError('family m = ' + str(m) + ', n = ' + str(n) + ', S = ' + str(S) + ' is not stored')
+        StoreFamily(m, n, S, root, processes)
+        entry = LoadIndex(root)[FamilyKey(m, n, S)]
+    return np.load(os.path.join(root, entry['file']), mmap_mode='r')
+
+
+def StoredFamilies(root=DefaultRoot):
+    '''return [(m, n, S, count)] for every family in the store'''
+    return sorted(tuple(map(int, key.split(','))) + (e['count'],) for key, e in LoadIndex(root).items())
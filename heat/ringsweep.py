@@ -0,0 +1,236 @@
+import argparse, os, random as rand, sys, time
+from multiprocessing import Pool, cpu_count
+import numpy as np
+import ringmodule as ring
+from ringstats import Summary
+
+
+####
+####
+#
+# Parallel Monte Carlo over random rings
+#
+#   Trials are cut into fixed-size chunks and each chunk gets its own child of one SeedSequence, so a
+#   given seed reproduces the same trials (in the same order) whatever the number of worker processes.
+#
+####
+####
+
+
+def TrialChunk(task):
+    '''for task = (n, x, S, count, seed): run count R_n_S -> RQ trials; return the rings and their fc, fs, Entropy'''
+    n, x, S, count, seed = task
+    ss = np.random.SeedSequence(seed) if not isinstance(seed, np.random.SeedSequence) else seed
+    ringRng, flipRng = ss.spawn(2)                           # one stream draws the rings, one chooses the flips
+    r = rand.Random(int(ringRng.generate_state(1, np.uint64)[0]))
+    Rs = np.array([ring.RandomBoundedRing(n, x, S, r) for i in range(count)], dtype=np.int64).reshape(count, n)
+    fc, fs, final = ring.BatchRQ(Rs, seed=np.random.default_rng(flipRng))
+    return Rs, fc, fs, ring.FastEntropy(Rs)
+
+
+def MapChunks(tasks, processes=None):
+    '''run TrialChunk over tasks, in a process pool unless processes == 1; return the results in task order'''
+    if processes == 1: return list(map(TrialChunk, tasks))
+    with Pool(processes or cpu_count()) as pool:
+        return pool.map(TrialChunk, tasks, chunksize=1)
+
+
+def ChunkTasks(n, x, S, n_trials, seed, chunk):
+    '''split n_trials trials into chunk-sized TrialChunk tasks, each with its own child SeedSequence of seed'''
+    if S < 1: raise ValueError('rings with sum ' + str(S) + ' never reach Q')    # BatchRQ would never return
+    if S > n*x: raise ValueError('no ring of ' + str(n) + ' sites within +-' + str(x) + ' sums to ' + str(S))
+    sizes = [min(chunk, n_trials - i) for i in range(0, n_trials, chunk)]
+    ss = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [(n, x, S, k, child) for k, child in zip(sizes, ss.spawn(len(sizes)))]
+
+
+def MonteCarlo(n, x, S, n_trials, seed=None, processes=None, chunk=1000):
+    '''run n_trials random (n, x, S) rings to Q on a process pool; return rings, fc, fs, Entropy in trial order'''
+    results = MapChunks(ChunkTasks(n, x, S, n_trials, seed, chunk), processes)
+    if not results: return np.zeros((0, n), dtype=np.int64), *(np.zeros(0, dtype=np.int64) for i in range(3))
+    return tuple(np.concatenate(part) for part in zip(*results))
+
+
+def CompareEntropyFormulaToEmpirical(n1, n2, n_trials, x, seed=None, processes=None, chunk=1000):
+    '''ringmodule.CompareEntropyFormulaToEmpirical spread across a process pool, reproducible from seed'''
+    print()
+    seeds = np.random.SeedSequence(seed).spawn(n2 - n1 + 1)
+    for n, ss in zip(range(n1, n2 + 1), seeds):
+        Rs, fc, fs, E = MonteCarlo(n, x, 1, n_trials, ss, processes, chunk)
+        for i in np.flatnonzero(E != fs):
+            print('    mismatch: ' + str(n) + ' with Rn = ' + str(list(Rs[i])))
+        if (E == fs).all(): print('n = ' + str(n) + '   ...all tests agree with the entropy cost function')
+    return
+
+
+Quantities = ('fc', 'fs', 'E')
+
+
+def StatsChunk(job):
+    '''for job = (TrialChunk task, bins): run the chunk; return a Summary of each of fc, fs and E (not the rings)
+
+    bins maps a quantity to the (lo, hi, bins) of its histogram; quantities left out get none.'''
+    task, bins = job
+    Rs, fc, fs, E = TrialChunk(task)
+    stats = {q: Summary((bins or {}).get(q)) for q in Quantities}
+    for q, values in zip(Quantities, (fc, fs, E.astype(np.int64))): stats[q].add_array(values, Rs)
+    return stats
+
+
+def MapStats(tasks, bins=None, processes=None):
+    '''yield StatsChunk of each task, in task order, as the pool finishes them'''
+    jobs = [(task, bins) for task in tasks]
+    if processes == 1:
+        yield from map(StatsChunk, jobs)
+        return
+    with Pool(processes or cpu_count()) as pool:
+        yield from pool.imap(StatsChunk, jobs)
+
+
+def MonteCarloStats(n, x, S, n_trials, seed=None, processes=None, chunk=1000, bins=None):
+    '''
+    MonteCarlo in constant memory: return a Summary (moments, extremes with their rings, optional histogram)
+    of each of fc, fs and E. The chunk summaries are merged in chunk order, so a seed gives the same result
+    whatever the number of processes; only one chunk's rings exist at a time in each worker.
+    '''
+    stats = {q: Summary((bins or {}).get(q)) for q in Quantities}
+    for part in MapStats(ChunkTasks(n, x, S, n_trials, seed, chunk), bins, processes):
+        for q in Quantities: stats[q].merge(part[q])
+    return stats
+
+
+def SumSweep(n, x, S_values, n_trials, seed=None, processes=None, chunk=1000):
+    '''for each S in S_values: run n_trials random (n, x, S) rings to Q; return lists of the fs and Entropy totals'''
+    tasks, owner = [], []                                    # every S's chunks share one pool
+    for S, ss in zip(S_values, np.random.SeedSequence(seed).spawn(len(S_values))):
+        these = ChunkTasks(n, x, S, n_trials, ss, chunk)
+        tasks += these
+        owner += [S]*len(these)
+    fs_sum, E_sum = {S: 0 for S in S_values}, {S: 0 for S in S_values}
+    for S, part in zip(owner, MapStats(tasks, processes=processes)):
+        fs_sum[S] += part['fs'].moments.total
+        E_sum[S] += part['E'].moments.total
+    return [fs_sum[S] for S in S_values], [E_sum[S] for S in S_values]
+
+
+####
+####
+#
+# Headless sweeps:  python -m ringsweep --n 3:16 --x 10 --S 1 --trials 2000 --out sweep_dir
+#
+#   Every (n, x, S) grid point is cut into chunks; each finished chunk is written by its worker as one
+#   columnar file (CSV or .npz: n, x, S, trial, fc, fs, E, elapsed). Re-running the same command skips the
+#   chunks already on disk, and because every chunk's seed depends only on --seed and its place in the
+#   grid, a resumed sweep produces the same files as an uninterrupted one.
+#
+####
+####
+
+
+Columns = ('n', 'x', 'S', 'trial', 'fc', 'fs', 'E', 'elapsed')
+
+
+def SweepTasks(out, ns, xs, Ss, n_trials, seed=None, chunk=1000, fmt='csv'):
+    '''return (path, fmt, first trial, TrialChunk task) for every chunk of the grid whose file is not yet in out'''
+    grid = [(n, x, S) for n in ns for x in xs for S in Ss]
+    tasks = []
+    for (n, x, S), ss in zip(grid, np.random.SeedSequence(seed).spawn(len(grid))):
+        for k, task in enumerate(ChunkTasks(n, x, S, n_trials, ss, chunk)):
+            path = os.path.join(out, 'n' + str(n) + '_x' + str(x) + '_S' + str(S) + '_c' + str(k).zfill(6) + '.' + fmt)
+            if not os.path.exists(path): tasks.append((path, fmt, k*chunk, task))
+    return tasks
+
+
+def SweepChunk(job):
+    '''run one sweep chunk and write its columns to its file (atomically: a partial file is never left behind)'''
+    path, fmt, first, task = job
+    n, x, S, count, seed = task
+    t0 = time.perf_counter()
+    Rs, fc, fs, E = TrialChunk(task)
+    elapsed = time.perf_counter() - t0
+    cols = {'n': np.full(count, n), 'x': np.full(count, x), 'S': np.full(count, S), 'trial': np.arange(first, first + count),
+            'fc': fc, 'fs': fs, 'E': E.astype(np.int64), 'elapsed': np.full(count, elapsed)}
+    tmp = path + '.part'
+    if fmt == 'npz':
+        with open(tmp, 'wb') as f: np.savez(f, **cols)
+    else:
+        with open(tmp, 'w') as f:
+            f.write(','.join(Columns) + '\n')
+            for row in zip(*(cols[c].tolist() for c in Columns)): f.write(','.join(map(str, row)) + '\n')
+    os.replace(tmp, path)
+    return path
+
+
+def ReadChunks(out):
+    '''yield the columns of each chunk file in out, as a dict of arrays, one file at a time'''
+    for name in sorted(os.listdir(out)):
+        path = os.path.join(out, name)
+        if name.endswith('.npz'):
+            with np.load(path) as z: yield {c: z[c] for c in Columns}
+        elif name.endswith('.csv'):
+            A = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+            yield {c: A[:, i] if c == 'elapsed' else A[:, i].astype(np.int64) for i, c in enumerate(Columns)}
+
+
+def LoadSweep(out):
+    '''read every chunk file in out back into one dict of column arrays'''
+    parts = {c: [] for c in Columns}
+    for cols in ReadChunks(out):
+        for c in Columns: parts[c].append(cols[c])
+    return {c: np.concatenate(v) if v else np.zeros(0) for c, v in parts.items()}
+
+
+def SummarizeSweep(out, bins=None):
+    '''fold the chunk files in out, one at a time, into {(n, x, S): {quantity: Summary}} (no rings on disk)'''
+    stats = {}
+    for cols in ReadChunks(out):
+        for key in set(zip(cols['n'].tolist(), cols['x'].tolist(), cols['S'].tolist())):
+            rows = (cols['n'] == key[0]) & (cols['x'] == key[1]) & (cols['S'] == key[2])
+            point = stats.setdefault(key, {q: Summary((bins or {}).get(q)) for q in Quantities})
+            for q in Quantities:
+                part = Summary((bins or {}).get(q))
+                part.add_array(cols[q][rows])
+                point[q].merge(part)
+    return stats
+
+
+def Span(text):
+    '''parse '3:16' (inclusive) or '5' into a list of ints'''
+    if ':' in text:
+        a, b = text.split(':')
+        return list(range(int(a), int(b) + 1))
+    return [int(text)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run R -> Q trials over a grid of (n, x, S) on all cores, writing '
+                                                 'one result file per chunk; re-run the same command to resume.')
+    parser.add_argument('--n', nargs='+', type=Span, required=True, help='ring sizes, e.g. 7 or 3:16')
+    parser.add_argument('--x', nargs='+', type=Span, required=True, help='site bounds')
+    parser.add_argument('--S', nargs='+', type=Span, default=[[1]], help='ring sums (default 1)')
+    parser.add_argument('--trials', type=int, required=True, help='trials per (n, x, S)')
+    parser.add_argument('--out', required=True, help='directory for the chunk files')
+    parser.add_argument('--chunk', type=int, default=1000, help='trials per chunk file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--format', choices=('csv', 'npz'), default='csv')
+    parser.add_argument('--summary', action='store_true', help='then print mean, std and extremes of each grid point')
+    args = parser.parse_args(argv)
+
+    flat = lambda lists: [v for l in lists for v in l]
+    os.makedirs(args.out, exist_ok=True)
+    try: jobs = SweepTasks(args.out, flat(args.n), flat(args.x), flat(args.S), args.trials, args.seed, args.chunk, args.format)
+    except ValueError as e: parser.error(str(e))             # before any worker starts
+    print(str(len(jobs)) + ' chunks to run')
+    with Pool(args.processes or cpu_count()) as pool:
+        for k, path in enumerate(pool.imap_unordered(SweepChunk, jobs)):
+            print('  [' + str(k + 1) + '/' + str(len(jobs)) + '] ' + os.path.basename(path))
+    if args.summary:
+        for (n, x, S), stats in sorted(SummarizeSweep(args.out).items()):
+            print('n = ' + str(n) + ', x = ' + str(x) + ', S = ' + str(S))
+            for q in Quantities: stats[q].report(q)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
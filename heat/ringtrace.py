@@ -0,0 +1,119 @@
+import json, os
+import numpy as np
+import ringmodule as ring
+
+
+####
+####
+#
+# Flip trajectories on disk
+#
+#   A trajectory file is a small JSON header (ring size, initial ring, cost names) followed by fixed-width
+#   records, one per flip: the site flipped, its new value and any cost values. Records are appended in
+#   chunks while the run goes and read back through a memory map, so neither side holds the whole run.
+#
+####
+####
+
+
+Magic = b'RINGTRC1'
+HeaderAlign = 64                                             # records start on a multiple of this many bytes
+ReplayChunk = 1 << 16                                        # records converted to Python ints at a time when replaying
+
+
+def RecordType(n_costs):
+    '''numpy dtype of one flip record with n_costs cost values'''
+    fields = [('site', '<i4'), ('value', '<i8')]
+    if n_costs: fields.append(('costs', '<f8', (n_costs,)))
+    return np.dtype(fields)
+
+
+class TrajectoryRecorder:
+    '''
+    Stream flips to a trajectory file. Use it as the observer of RQ, RQFast or a Chart* loop (scan events
+    are ignored), or call record(site, value) directly. With a CostTracker, each record also stores the
+    tracker's current values; that suits loops that flip through tracker.flip.
+    '''
+
+    def __init__(self, path, R, tracker=None, cost_names=None, chunk=1 << 16):
+        self.tracker = tracker
+        n_costs = len(tracker.values) if tracker is not None else 0
+        if cost_names is None: cost_names = [c[0].__name__ for c in tracker.costs] if tracker is not None else []
+        self.dtype = RecordType(n_costs)
+        self.buffer, self.k, self.count = np.zeros(chunk, dtype=self.dtype), 0, 0
+        header = json.dumps({'n': len(R), 'initial': [int(v) for v in R], 'costs': cost_names,
+                             'dtype': self.dtype.descr}).encode()
+        pad = -(len(Magic) + 8 + len(header)) % HeaderAlign
+        self.file = open(path, 'wb')
+        self.file.write(Magic + (len(header) + pad).to_bytes(8, 'little') + header + b' '*pad)
+
+    def __call__(self, step, site, value):
+        if site >= 0: self.record(site, value)
+
+    def record(self, site, value):
+        '''append one flip: site flipped and the value it now holds'''
+        b = self.buffer[self.k]
+        b['site'], b['value'] = site, value
+        if self.tracker is not None: b['costs'] = self.tracker.values
+        self.k += 1
+        self.count += 1
+        if self.k == len(self.buffer): self.flush()
+
+    def flush(self):
+        '''write the buffered records to the file'''
+        self.file.write(self.buffer[:self.k].tobytes())
+        self.file.flush()
+        self.k = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    '''Memory-mapped view of a trajectory file: sites, values and costs are numpy arrays backed by the file'''
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(Magic)) != Magic: raise ValueError(path + ' is not a ring trajectory file')
+            size = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(size))
+        self.n, self.initial, self.cost_names = header['n'], header['initial'], header['costs']
+        self.dtype = np.dtype([tuple(field) for field in header['dtype']])
+        offset = len(Magic) + 8 + size
+        count = (os.path.getsize(path) - offset)//self.dtype.itemsize  # a torn final record is ignored
+        self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=offset, shape=(count,)) if count \
+            else np.zeros(0, dtype=self.dtype)
+        self.sites, self.values = self.records['site'], self.records['value']
+        self.costs = self.records['costs'] if 'costs' in self.dtype.names else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def replay(self, check=True):
+        '''yield (step, R) after each flip, re-applying the recorded sites to the initial ring (R is reused)'''
+        R, step = list(self.initial), 0
+        for start in range(0, len(self), ReplayChunk):      # pull the records off the map a chunk at a time
+            stop = start + ReplayChunk
+            for a, value in zip(self.sites[start:stop].tolist(), self.values[start:stop].tolist()):
+                R, v = ring.Flip(R, a)
+                if check and R[a] != value: raise ValueError('replay diverges at step ' + str(step))
+                yield step, R
+                step += 1
+
+    def state(self, k):
+        '''return the ring after the first k flips'''
+        if k == 0: return list(self.initial)
+        for step, R in self.replay():
+            if step == k - 1: return list(R)
+        raise IndexError('trajectory has only ' + str(len(self)) + ' flips')
+
+    def fc_fs(self):
+        '''return the flip count and flip sum of the recorded run'''
+        return len(self), 2*int(self.values.sum())